@@ -174,6 +174,7 @@ def send_email_draft(mcp_client, db) -> None:
         "assistant",
         confirmation,
         tokens_out=out_toks,
+        user_id=st.session_state.user_id,
     )
     mcp_client.log_interaction(
         st.session_state.current_session_id,
@@ -415,7 +415,7 @@ else:
                         if st.button("Save name", key=f"{options_prefix}_rename_save", use_container_width=True):
                             final_name = sanitize_user_input((rename_value or default_name).strip())
                             if final_name != default_name:
-                                db.rename_session(st.session_state.current_session_id, final_name)
+                                db.rename_session(st.session_state.current_session_id, final_name, user_id=st.session_state.user_id)
                             st.rerun()
 
                         st.divider()
@@ -434,7 +434,7 @@ else:
                         )
 
                         if st.button("🗑️ Delete session", key=f"{options_prefix}_delete", use_container_width=True):
-                            db.delete_session(st.session_state.current_session_id)
+                            db.delete_session(st.session_state.current_session_id, user_id=st.session_state.user_id)
                             st.session_state.current_session_id = None
                             st.session_state.messages = []
                             st.session_state.token_total = 0
@@ -672,7 +672,7 @@ else:
                 st.session_state.token_total += (in_toks + out_toks)
                 st.session_state.limit_reached = st.session_state.token_total >= SESSION_TOKEN_LIMIT
                 st.session_state.messages.append({"role": "assistant", "content": warn})
-                db.add_message(st.session_state.current_session_id, "assistant", warn, tokens_out=out_toks)
+                db.add_message(st.session_state.current_session_id, "assistant", warn, tokens_out=out_toks, user_id=st.session_state.user_id)
                 mcp_client.log_interaction(st.session_state.current_session_id, "injection_blocked", {"prompt": clean, "response": warn})
                 logger.log_event(
                     category="request",
@@ -714,7 +714,7 @@ else:
                         st.session_state.token_total += (in_toks + out_toks)
                         st.session_state.limit_reached = st.session_state.token_total >= SESSION_TOKEN_LIMIT
                         st.session_state.messages.append({"role": "assistant", "content": final_text})
-                        db.add_message(st.session_state.current_session_id, "assistant", final_text, tokens_out=out_toks)
+                        db.add_message(st.session_state.current_session_id, "assistant", final_text, tokens_out=out_toks, user_id=st.session_state.user_id)
                         mcp_client.log_interaction(
                             st.session_state.current_session_id,
                             "regenerate_response",
@@ -742,7 +742,7 @@ else:
                         error_msg = "We weren't able to generate a response. Please try again."
                         thinking_placeholder.markdown(error_msg)
                         st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                        db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=estimate_tokens(error_msg))
+                        db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=estimate_tokens(error_msg), user_id=st.session_state.user_id)
                         mcp_client.log_interaction(st.session_state.current_session_id, "assistant_error", {"prompt": clean, "error": "empty_response"})
                         logger.log_event(
                             category="request",
@@ -763,7 +763,7 @@ else:
                     st.session_state.token_total += (in_toks + out_toks)
                     st.session_state.limit_reached = st.session_state.token_total >= SESSION_TOKEN_LIMIT
                     st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=out_toks)
+                    db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=out_toks, user_id=st.session_state.user_id)
                     mcp_client.log_interaction(st.session_state.current_session_id, "content_filter_block", {"prompt": clean, "error": error_msg})
 
                     # Log structured error event to Splunk
@@ -906,7 +906,7 @@ else:
 
             # Add user message
             st.session_state.messages.append({"role": "user", "content": clean})
-            db.add_message(st.session_state.current_session_id, "user", clean, tokens_in=in_toks)
+            db.add_message(st.session_state.current_session_id, "user", clean, tokens_in=in_toks, user_id=st.session_state.user_id)
 
             with chat_col:
                 with st.chat_message("user"):
@@ -924,7 +924,7 @@ else:
                 st.session_state.token_total += (in_toks + out_toks)
                 st.session_state.limit_reached = st.session_state.token_total >= SESSION_TOKEN_LIMIT
                 st.session_state.messages.append({"role": "assistant", "content": warn})
-                db.add_message(st.session_state.current_session_id, "assistant", warn, tokens_out=out_toks)
+                db.add_message(st.session_state.current_session_id, "assistant", warn, tokens_out=out_toks, user_id=st.session_state.user_id)
                 mcp_client.log_interaction(st.session_state.current_session_id, "injection_blocked", {"prompt": clean, "response": warn})
             else:
                 # Generate response with RAG
@@ -953,7 +953,7 @@ else:
                         st.session_state.token_total += (in_toks + out_toks)
                         st.session_state.limit_reached = st.session_state.token_total >= SESSION_TOKEN_LIMIT
                         st.session_state.messages.append({"role": "assistant", "content": final_text})
-                        db.add_message(st.session_state.current_session_id, "assistant", final_text, tokens_out=out_toks)
+                        db.add_message(st.session_state.current_session_id, "assistant", final_text, tokens_out=out_toks, user_id=st.session_state.user_id)
                         mcp_client.log_interaction(
                             st.session_state.current_session_id,
                             "assistant_reply",
@@ -982,7 +982,7 @@ else:
                         error_msg = "We weren't able to generate a response. Please try again."
                         thinking_placeholder.markdown(error_msg)
                         st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                        db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=estimate_tokens(error_msg))
+                        db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=estimate_tokens(error_msg), user_id=st.session_state.user_id)
                         mcp_client.log_interaction(st.session_state.current_session_id, "assistant_error", {"prompt": clean, "error": "empty_response"})
                 except RuntimeError as e:
                     # Catch content filter blocks and other Azure errors
@@ -992,7 +992,7 @@ else:
                     st.session_state.token_total += (in_toks + out_toks)
                     st.session_state.limit_reached = st.session_state.token_total >= SESSION_TOKEN_LIMIT
                     st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=out_toks)
+                    db.add_message(st.session_state.current_session_id, "assistant", error_msg, tokens_out=out_toks, user_id=st.session_state.user_id)
                     mcp_client.log_interaction(st.session_state.current_session_id, "content_filter_block", {"prompt": clean, "error": error_msg})
 
                     # Log structured error event to Splunk
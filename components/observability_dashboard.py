@@ -1,8 +1,75 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _mock_timeseries(seed_bucket: int) -> dict[str, pd.DataFrame]:
+    """Build the sample chart data once per minute bucket instead of on every rerun."""
+    dates = pd.date_range(end=datetime.now(), periods=24, freq='h', name='Time')
+    # One draw for all five series; seeding by bucket keeps a minute's data stable
+    m = np.random.default_rng(seed_bucket).random((24, 5))
+    # Index is set at construction so no set_index copy is needed
+    return {
+        "requests": pd.DataFrame(
+            {'Requests': (m[:, 0] * 50 + 30).astype(np.int32)},
+            index=dates,
+        ),
+        "quality": pd.DataFrame({'Avg Score': 0.6 + 0.3 * m[:, 1]}, index=dates),
+        "latency": pd.DataFrame(
+            {'P50': 800 + 400 * m[:, 2], 'P95': 1500 + 1000 * m[:, 3]},
+            index=dates,
+        ),
+        "db": pd.DataFrame({'Duration (ms)': 30 + 90 * m[:, 4]}, index=dates),
+        "events": pd.DataFrame(
+            {'Count': [640, 480, 220, 160, 130, 110, 40, 25]},
+            index=pd.Index(
+                ['Request', 'RAG', 'LLM', 'API', 'Database', 'MCP', 'Security', 'Agent'],
+                name='Category',
+            ),
+        ),
+    }
+
+
+# Static table contents, built once at import; st.dataframe takes dict-of-lists directly
+_IMPL_DATA = {
+    "Component": [
+        "Event Collector",
+        "Transport",
+        "Instrumented Modules",
+        "Event Categories",
+        "Fallback / Resilience"
+    ],
+    "Status": [
+        "The shared Splunk logger handles batching + timing and feeds every module data safely",
+        "Events stream into Splunk’s HTTP collector (with retries and a fallback file) ",
+        "From chat orchestration to Google tools, every layer calls the same logging helper",
+        "We treat requests, RAG, LLMs, APIs, database ops, MCP I/O, security, and UI actions as first-class data sources",
+        "If HEC is unreachable we drop into a local log so nothing silently disappears"
+    ]
+}
+
+_PERF_DATA = {
+    "Optimization": [
+        "Session/Message Cache",
+        "Rerank Cache",
+        "Neighbor Batching",
+        "MCP Metrics",
+        "API Metadata"
+    ],
+    "Impact": [
+        "Warm caches keep Supabase quiet between chat polls",
+        "The reranker stays fast by skipping repeat query/doc pairs",
+        "Neighbor lookups run as one bundled query instead of dozens",
+        "Every MCP tool call is timed and labeled so slow tools stand out",
+        "API logs capture recipient, status, and duration for clear audit trails"
+    ]
+}
+
+
 def show_observability_dashboard():
     """Display professional Splunk observability dashboard."""
 
@@ -60,28 +127,18 @@ def show_observability_dashboard():
         # Charts section
         col1, col2 = st.columns(2)
 
-        # Generate mock data for last 24 hours
-        dates = pd.date_range(end=datetime.now(), periods=24, freq='h')
+        # Mock data for last 24 hours, regenerated at most once a minute
+        charts = _mock_timeseries(int(time.time()) // 60)
 
         with col1:
             st.subheader("Request Volume Over Time")
             st.caption("Every question and regenerate request flowing through the app")
-
-            df_requests = pd.DataFrame({
-                'Time': dates,
-                'Requests': np.random.randint(30, 80, 24)
-            })
-            st.line_chart(df_requests.set_index('Time'))
+            st.line_chart(charts["requests"])
 
         with col2:
             st.subheader("RAG Retrieval Quality")
             st.caption("How confident the reranker feels about the retrieved chunks")
-
-            df_quality = pd.DataFrame({
-                'Time': dates,
-                'Avg Score': np.random.uniform(0.6, 0.9, 24)
-            })
-            st.line_chart(df_quality.set_index('Time'))
+            st.line_chart(charts["quality"])
 
         # Second row of charts
         col1, col2 = st.columns(2)
@@ -89,23 +146,12 @@ def show_observability_dashboard():
         with col1:
             st.subheader("Response Latency Percentiles")
             st.caption("Median vs. tail latency for the end‑to‑end response time")
-
-            df_latency = pd.DataFrame({
-                'Time': dates,
-                'P50': np.random.uniform(800, 1200, 24),
-                'P95': np.random.uniform(1500, 2500, 24)
-            })
-            st.line_chart(df_latency.set_index('Time'))
+            st.line_chart(charts["latency"])
 
         with col2:
             st.subheader("Database Query Performance")
             st.caption("Supabase reads/writes measured inside the database client")
-
-            df_db = pd.DataFrame({
-                'Time': dates,
-                'Duration (ms)': np.random.uniform(30, 120, 24)
-            })
-            st.area_chart(df_db.set_index('Time'))
+            st.area_chart(charts["db"])
 
         st.divider()
 
@@ -116,11 +162,7 @@ def show_observability_dashboard():
         col1, col2 = st.columns([2, 1])
 
         with col1:
-            event_data = pd.DataFrame({
-                'Category': ['Request', 'RAG', 'LLM', 'API', 'Database', 'MCP', 'Security', 'Agent'],
-                'Count': [640, 480, 220, 160, 130, 110, 40, 25]
-            })
-            st.bar_chart(event_data.set_index('Category'), height=300)
+            st.bar_chart(charts["events"], height=300)
 
         with col2:
             st.markdown("**Event Categories**")
@@ -143,25 +185,8 @@ def show_observability_dashboard():
 
         with col1:
             st.markdown("**Observability Stack**")
-            impl_data = {
-                "Component": [
-                    "Event Collector",
-                    "Transport",
-                    "Instrumented Modules",
-                    "Event Categories",
-                    "Fallback / Resilience"
-                ],
-                "Status": [
-                    "The shared Splunk logger handles batching + timing and feeds every module data safely",
-                    "Events stream into Splunk’s HTTP collector (with retries and a fallback file) ",
-                    "From chat orchestration to Google tools, every layer calls the same logging helper",
-                    "We treat requests, RAG, LLMs, APIs, database ops, MCP I/O, security, and UI actions as first-class data sources",
-                    "If HEC is unreachable we drop into a local log so nothing silently disappears"
-                ]
-            }
-            df_impl = pd.DataFrame(impl_data)
             st.dataframe(
-                df_impl,
+                _IMPL_DATA,
                 hide_index=True,
                 width="stretch",
                 column_config={
@@ -172,25 +197,8 @@ def show_observability_dashboard():
 
         with col2:
             st.markdown("**What We Watch For**")
-            perf_data = {
-                "Optimization": [
-                    "Session/Message Cache",
-                    "Rerank Cache",
-                    "Neighbor Batching",
-                    "MCP Metrics",
-                    "API Metadata"
-                ],
-                "Impact": [
-                      "Warm caches keep Supabase quiet between chat polls",
-                      "The reranker stays fast by skipping repeat query/doc pairs",
-                      "Neighbor lookups run as one bundled query instead of dozens",
-                      "Every MCP tool call is timed and labeled so slow tools stand out",
-                      "API logs capture recipient, status, and duration for clear audit trails"
-                  ]
-            }
-            df_perf = pd.DataFrame(perf_data)
             st.dataframe(
-                df_perf,
+                _PERF_DATA,
                 hide_index=True,
                 width="stretch",
                 column_config={
@@ -0,0 +1,100 @@
+-- Chat persistence helpers used by utils/database.py.
+-- Run in the Supabase SQL editor after the chat_sessions/messages/audit_logs tables exist.
+-- Table names are fixed here: the RPC-backed paths (add/delete/search/count) ignore
+-- SUPABASE_SESSIONS_TABLE / SUPABASE_MESSAGES_TABLE overrides.
+
+-- Ids and timestamps are filled server-side so clients never send them.
+alter table chat_sessions alter column id set default gen_random_uuid();
+alter table messages alter column id set default gen_random_uuid();
+alter table audit_logs alter column id set default gen_random_uuid();
+alter table chat_sessions alter column created_at set default now();
+alter table chat_sessions alter column updated_at set default now();
+alter table messages alter column created_at set default now();
+alter table audit_logs alter column created_at set default now();
+
+-- Insert a message and bump its session's updated_at in one round-trip.
+-- Returns the new message id. The drop clears older definitions whose parameter names differ.
+drop function if exists add_message_and_touch(uuid, text, text, int, int);
+
+create or replace function add_message_and_touch(
+    p_session_id uuid,
+    p_role text,
+    p_content text,
+    p_tokens_in int,
+    p_tokens_out int
+)
+returns uuid
+language plpgsql
+as $$
+declare
+    new_id uuid;
+begin
+    insert into messages (session_id, role, content, tokens_in, tokens_out)
+    values (p_session_id, p_role, p_content, p_tokens_in, p_tokens_out)
+    returning id into new_id;
+
+    update chat_sessions
+    set updated_at = now()
+    where id = p_session_id;
+
+    return new_id;
+end;
+$$;
+
+-- Remove a session and its messages in one transaction.
+create or replace function delete_session_cascade(p_session_id uuid)
+returns void
+language plpgsql
+as $$
+begin
+    delete from messages where session_id = p_session_id;
+    delete from chat_sessions where id = p_session_id;
+end;
+$$;
+
+-- Sessions whose name or any message matches p_q (lowercased and LIKE-escaped by the client).
+create extension if not exists pg_trgm;
+
+alter table chat_sessions
+    add column if not exists session_name_lower text
+    generated always as (lower(session_name)) stored;
+
+create index if not exists chat_sessions_name_lower_trgm_idx
+    on chat_sessions using gin (session_name_lower gin_trgm_ops);
+create index if not exists messages_content_trgm_idx
+    on messages using gin (content gin_trgm_ops);
+
+create or replace function search_user_sessions(p_user_id uuid, p_q text)
+returns setof chat_sessions
+language sql
+stable
+as $$
+    select s.*
+    from chat_sessions s
+    where s.user_id = p_user_id
+      and (
+          s.session_name_lower like '%' || p_q || '%'
+          or exists (
+              select 1
+              from messages m
+              where m.session_id = s.id
+                and m.content ilike '%' || p_q || '%'
+          )
+      )
+    order by s.updated_at desc;
+$$;
+
+-- Total messages across all of a user's sessions.
+create index if not exists messages_session_id_idx on messages (session_id);
+create index if not exists chat_sessions_user_id_idx on chat_sessions (user_id);
+
+create or replace function user_message_count(p_user_id uuid)
+returns bigint
+language sql
+stable
+as $$
+    select count(*)
+    from messages m
+    join chat_sessions s on m.session_id = s.id
+    where s.user_id = p_user_id;
+$$;
@@ -1,6 +1,6 @@
 import os
+import threading
 import time
-from functools import lru_cache
 from typing import Generator, List, Dict, Any, Optional
 
 from openai import AzureOpenAI, OpenAI, NotFoundError, BadRequestError
@@ -17,8 +17,14 @@ def require_azure_env(value: str | None, name: str) -> str:
     return value
 
 
+def _is_openai_v1_endpoint(endpoint: str) -> bool:
+    # "/openai/" also covers endpoints ending in "/openai/v1"
+    return ".services.ai.azure.com" in endpoint or "/openai/" in endpoint
+
+
 def _build_openai_compatible_client(endpoint: str, key: str) -> OpenAI:
-    base = endpoint.rstrip("/")
+    """Expects `endpoint` already stripped of trailing slashes."""
+    base = endpoint
     if not base.endswith("/openai/v1"):
         base += "/openai/v1/"
     return OpenAI(
@@ -27,13 +33,17 @@ def _build_openai_compatible_client(endpoint: str, key: str) -> OpenAI:
         default_headers={"api-key": key},
     )
 
-@lru_cache(maxsize=1)
-def get_azure_client():
+_client_singleton: OpenAI | AzureOpenAI | None = None
+_client_lock = threading.Lock()
+
+
+def _build_azure_client() -> OpenAI | AzureOpenAI:
+    # Env is read here rather than at import: the MCP subprocess imports this module before load_dotenv()
     endpoint = require_azure_env(os.getenv("AZURE_OPENAI_ENDPOINT"), "AZURE_OPENAI_ENDPOINT").rstrip("/")
     key = require_azure_env(os.getenv("AZURE_OPENAI_API_KEY"), "AZURE_OPENAI_API_KEY")
     api_version = os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_AZURE_OPENAI_API_VERSION)
 
-    if ".services.ai.azure.com" in endpoint or endpoint.endswith("/openai/v1") or "/openai/" in endpoint:
+    if _is_openai_v1_endpoint(endpoint):
         return _build_openai_compatible_client(endpoint, key)
 
     return AzureOpenAI(
@@ -42,20 +52,25 @@ def get_azure_client():
         azure_endpoint=endpoint,
     )
 
+def get_azure_client():
+    global _client_singleton
+    if _client_singleton is None:
+        with _client_lock:
+            if _client_singleton is None:
+                _client_singleton = _build_azure_client()
+    return _client_singleton
+
 def _content_to_text(content: Any) -> str:
     if isinstance(content, str):
         return content
     if isinstance(content, list):
-        parts = []
-        for item in content:
-            if isinstance(item, dict):
-                text = item.get("text")
-                if text:
-                    parts.append(text)
-            elif isinstance(item, str):
-                parts.append(item)
-        if parts:
-            return "".join(parts)
+        joined = "".join(
+            item["text"] if isinstance(item, dict) else item
+            for item in content
+            if (isinstance(item, dict) and item.get("text")) or isinstance(item, str)
+        )
+        if joined:
+            return joined
     return str(content or "")
 
 def _estimate_tokens(text: str) -> int:
@@ -168,12 +183,21 @@ def stream_chat(
 
     try:
         for event in stream:
-            for choice in getattr(event, "choices", []):
-                delta = getattr(choice, "delta", None)
-                if delta and delta.content:
-                    content = _content_to_text(delta.content)
-                    tokens_out += _estimate_tokens(content)
-                    yield content
+            # Streaming requests use n=1, so only the first choice carries content
+            try:
+                choices = event.choices
+                if not choices:
+                    continue
+                delta = choices[0].delta
+                text = delta.content if delta else None
+            except AttributeError:
+                continue
+            if not text:
+                continue
+            # Plain str is the overwhelmingly common case; exact type check skips the MRO walk
+            content = text if type(text) is str else _content_to_text(text)
+            tokens_out += _estimate_tokens(content)
+            yield content
 
         success = True
     except Exception as exc:
@@ -1,30 +1,186 @@
 import os
-import uuid
-import json
 import logging
+import queue
 import threading
 import time
 from datetime import datetime
 from typing import Any, Optional
 
+import orjson
+import streamlit as st
+
 from utils.supabase_client import get_supabase_client
 from utils.security import escape_sql_like
-from utils.state_manager import (
-    get_cached_sessions,
-    set_cached_sessions,
-    invalidate_session_cache,
-    get_cached_messages,
-    set_cached_messages,
-    invalidate_messages_cache
-)
 from utils.splunk_logger import get_splunk_logger
 
 logger = logging.getLogger(__name__)
 splunk_logger = get_splunk_logger()
 
+ADD_MESSAGE_FUNCTION = os.getenv("SUPABASE_ADD_MESSAGE_FUNCTION", "add_message_and_touch")
+DELETE_SESSION_FUNCTION = os.getenv("SUPABASE_DELETE_SESSION_FUNCTION", "delete_session_cascade")
+SEARCH_SESSIONS_FUNCTION = os.getenv("SUPABASE_SEARCH_SESSIONS_FUNCTION", "search_user_sessions")
+MESSAGE_COUNT_FUNCTION = os.getenv("SUPABASE_MESSAGE_COUNT_FUNCTION", "user_message_count")
+
+# created_at/updated_at default to now() server-side; only updates need a client timestamp
+_ISO_FMT = "%Y-%m-%dT%H:%M:%S"
+
+AUDIT_QUEUE_MAXSIZE = 10_000
+AUDIT_BATCH_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 0.5
+
+# Short TTL: Streamlit reruns re-read sessions/messages constantly; writes clear entries explicitly
+READ_CACHE_TTL = 5
+
+
+def _log_db_query(
+    operation: str,
+    duration_ms: float,
+    success: bool,
+    *,
+    table: str,
+    result_count: int = 0,
+    error: Optional[str] = None,
+) -> None:
+    splunk_logger.log_event(
+        category="database",
+        event_type="query",
+        payload={
+            "operation": operation,
+            "table": table,
+            "success": success,
+            "error": error,
+            "result_count": result_count,
+        },
+        metrics={"duration_ms": duration_ms},
+        component="database",
+    )
+
+
+@st.cache_data(ttl=READ_CACHE_TTL, show_spinner=False)
+def _fetch_user_sessions(sessions_table: str, user_id: str) -> list[dict]:
+    start = time.perf_counter()
+    success = False
+    error_msg = None
+    results: list[dict] = []
+    try:
+        resp = (
+            get_supabase_client().table(sessions_table)
+            .select("*")
+            .eq("user_id", user_id)
+            .order("updated_at", desc=True)
+            .execute()
+        )
+        results = getattr(resp, "data", []) or []
+        success = True
+        return results
+    except Exception as e:
+        error_msg = str(e)
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        _log_db_query(
+            "get_user_sessions",
+            duration_ms,
+            success,
+            table=sessions_table,
+            result_count=len(results),
+            error=error_msg,
+        )
+
+
+@st.cache_data(ttl=READ_CACHE_TTL, show_spinner=False)
+def _fetch_session_messages(messages_table: str, session_id: str) -> list[dict]:
+    start = time.perf_counter()
+    success = False
+    error_msg = None
+    results: list[dict] = []
+    try:
+        resp = (
+            get_supabase_client().table(messages_table)
+            .select("*")
+            .eq("session_id", session_id)
+            .order("created_at", desc=False)
+            .execute()
+        )
+        results = getattr(resp, "data", []) or []
+        success = True
+        return results
+    except Exception as e:
+        error_msg = str(e)
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        _log_db_query(
+            "get_session_messages",
+            duration_ms,
+            success,
+            table=messages_table,
+            result_count=len(results),
+            error=error_msg,
+        )
+
+
+# One process-wide audit queue + worker: app.py builds a ChatDatabase on every Streamlit rerun,
+# so per-instance workers would leak a thread per rerun.
+_audit_queue: queue.Queue[tuple[str, dict[str, Any]]] = queue.Queue(maxsize=AUDIT_QUEUE_MAXSIZE)
+_audit_worker_thread: threading.Thread | None = None
+_audit_worker_lock = threading.Lock()
+
+
+def _ensure_audit_worker() -> None:
+    global _audit_worker_thread
+    if _audit_worker_thread is not None:
+        return
+    with _audit_worker_lock:
+        if _audit_worker_thread is None:
+            _audit_worker_thread = threading.Thread(target=_audit_worker_loop, daemon=True)
+            _audit_worker_thread.start()
+
+
+def _drain_audit_queue(
+    timeout: float = 0.0,
+    first: tuple[str, dict[str, Any]] | None = None,
+) -> list[tuple[str, dict[str, Any]]]:
+    """Collect up to AUDIT_BATCH_SIZE records (including `first`), waiting at most `timeout` seconds."""
+    batch: list[tuple[str, dict[str, Any]]] = [first] if first is not None else []
+    deadline = time.monotonic() + timeout
+    while len(batch) < AUDIT_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                batch.append(_audit_queue.get(timeout=remaining))
+            else:
+                batch.append(_audit_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _flush_audit_batch(batch: list[tuple[str, dict[str, Any]]]) -> None:
+    by_table: dict[str, list[dict[str, Any]]] = {}
+    for table, record in batch:
+        by_table.setdefault(table, []).append(record)
+    for table, records in by_table.items():
+        try:
+            get_supabase_client().table(table).insert(records).execute()
+        except Exception as e:
+            logger.error(f"Failed to flush audit batch to {table}: {e}")
+
+
+def _audit_worker_loop() -> None:
+    while True:
+        # Block until there is work, then gather whatever else arrives within the flush window
+        first = _audit_queue.get()
+        _flush_audit_batch(_drain_audit_queue(AUDIT_FLUSH_INTERVAL, first))
+
+
 class ChatDatabase:
     """
     Supabase-backed chat persistence for sessions, messages, and audit logs.
+
+    add_message, delete_session, search_sessions and get_total_message_count go through
+    the RPCs in docs/chat_functions.sql, which hardcode the chat_sessions/messages tables.
+    Custom sessions_table/messages_table names only apply to the direct table calls.
     """
 
     def __init__(
@@ -38,12 +194,8 @@ class ChatDatabase:
         self._messages_table = messages_table or os.getenv("SUPABASE_MESSAGES_TABLE", "messages")
         self._audit_table = audit_table or os.getenv("SUPABASE_AUDIT_TABLE", "audit_logs")
 
-        self._audit_batch = []
-        self._audit_lock = threading.Lock()
-        self._audit_batch_size = 10
-        self._audit_worker_thread = None
-        self._audit_shutdown_event = threading.Event()
-        self._start_audit_worker()
+        if self._audit_table:
+            _ensure_audit_worker()
 
     def _log_db_event(
         self,
@@ -55,32 +207,22 @@ class ChatDatabase:
         error: Optional[str] = None,
         table: Optional[str] = None,
     ) -> None:
-        splunk_logger.log_event(
-            category="database",
-            event_type="query",
-            payload={
-                "operation": operation,
-                "table": table or self._sessions_table,
-                "success": success,
-                "error": error,
-                "result_count": result_count,
-            },
-            metrics={"duration_ms": duration_ms},
-            component="database",
+        _log_db_query(
+            operation,
+            duration_ms,
+            success,
+            table=table or self._sessions_table,
+            result_count=result_count,
+            error=error,
         )
 
     def create_session(self, user_id: str, session_name: str) -> Optional[str]:
         start = time.perf_counter()
         success = False
         error_msg = None
-        sid = str(uuid.uuid4())
-        now = datetime.utcnow().isoformat(timespec="seconds")
         record = {
-            "id": sid,
             "user_id": user_id,
             "session_name": session_name,
-            "created_at": now,
-            "updated_at": now,
         }
         try:
             resp = (
@@ -88,10 +230,11 @@ class ChatDatabase:
                 .insert(record)
                 .execute()
             )
-            success = bool(getattr(resp, "data", []))
+            data = getattr(resp, "data", None)
+            success = bool(data)
             if success:
-                invalidate_session_cache()
-                return sid
+                _fetch_user_sessions.clear(self._sessions_table, user_id)
+                return data[0]["id"]
             return None
         except Exception as e:
             error_msg = str(e)
@@ -109,40 +252,11 @@ class ChatDatabase:
             )
 
     def get_user_sessions(self, user_id: str) -> list[dict]:
-        cached = get_cached_sessions(user_id)
-        if cached is not None:
-            return cached
-
-        start = time.perf_counter()
-        success = False
-        error_msg = None
-        results: list[dict] = []
         try:
-            resp = (
-                self._client.table(self._sessions_table)
-                .select("*")
-                .eq("user_id", user_id)
-                .order("updated_at", desc=True)
-                .execute()
-            )
-            results = getattr(resp, "data", []) or []
-            set_cached_sessions(user_id, results)
-            success = True
-            return results
+            return _fetch_user_sessions(self._sessions_table, user_id)
         except Exception as e:
-            error_msg = str(e)
             logger.error(f"Failed to get user sessions for {user_id}: {e}")
             return []
-        finally:
-            duration_ms = (time.perf_counter() - start) * 1000
-            self._log_db_event(
-                "get_user_sessions",
-                duration_ms,
-                success,
-                result_count=len(results) if success else 0,
-                error=error_msg,
-                table=self._sessions_table,
-            )
 
     def get_session(self, session_id: str) -> Optional[dict]:
         start = time.perf_counter()
@@ -176,16 +290,16 @@ class ChatDatabase:
                 table=self._sessions_table,
             )
 
-    def rename_session(self, session_id: str, new_name: str) -> bool:
+    def rename_session(self, session_id: str, new_name: str, *, user_id: str) -> bool:
         start = time.perf_counter()
-        now = datetime.utcnow().isoformat(timespec="seconds")
+        now = datetime.utcnow().strftime(_ISO_FMT)
         success = False
         error_msg = None
         try:
             self._client.table(self._sessions_table).update(
                 {"session_name": new_name, "updated_at": now}
             ).eq("id", session_id).execute()
-            invalidate_session_cache()
+            _fetch_user_sessions.clear(self._sessions_table, user_id)
             success = True
             return True
         except Exception as e:
@@ -203,15 +317,15 @@ class ChatDatabase:
                 table=self._sessions_table,
             )
 
-    def delete_session(self, session_id: str) -> None:
+    def delete_session(self, session_id: str, *, user_id: str) -> None:
         start = time.perf_counter()
         success = False
         error_msg = None
         try:
-            self._client.table(self._messages_table).delete().eq("session_id", session_id).execute()
-            self._client.table(self._sessions_table).delete().eq("id", session_id).execute()
-            invalidate_session_cache()
-            invalidate_messages_cache(session_id)
+            # Messages and session row go in one transaction (see docs/chat_functions.sql)
+            self._client.rpc(DELETE_SESSION_FUNCTION, {"p_session_id": session_id}).execute()
+            _fetch_user_sessions.clear(self._sessions_table, user_id)
+            _fetch_session_messages.clear(self._messages_table, session_id)
             success = True
         except Exception as e:
             error_msg = str(e)
@@ -230,40 +344,11 @@ class ChatDatabase:
 
     # messages
     def get_session_messages(self, session_id: str) -> list[dict]:
-        cached = get_cached_messages(session_id)
-        if cached is not None:
-            return cached
-
-        start = time.perf_counter()
-        success = False
-        error_msg = None
-        results = []
         try:
-            resp = (
-                self._client.table(self._messages_table)
-                .select("*")
-                .eq("session_id", session_id)
-                .order("created_at", desc=False)
-                .execute()
-            )
-            results = getattr(resp, "data", []) or []
-            set_cached_messages(session_id, results)
-            success = True
-            return results
+            return _fetch_session_messages(self._messages_table, session_id)
         except Exception as e:
-            error_msg = str(e)
             logger.error(f"Failed to get session messages for {session_id}: {e}")
             return []
-        finally:
-            duration_ms = (time.perf_counter() - start) * 1000
-            self._log_db_event(
-                "get_session_messages",
-                duration_ms,
-                success,
-                result_count=len(results),
-                error=error_msg,
-                table=self._messages_table,
-            )
 
     def add_message(
         self,
@@ -272,30 +357,26 @@ class ChatDatabase:
         content: str,
         tokens_in: int | None = None,
         tokens_out: int | None = None,
+        *,
+        user_id: str,
     ) -> Optional[str]:
         start = time.perf_counter()
         success = False
         error_msg = None
-        mid = str(uuid.uuid4())
-        now = datetime.utcnow().isoformat(timespec="seconds")
-        record = {
-            "id": mid,
-            "session_id": session_id,
-            "role": role,
-            "content": content,
-            "tokens_in": tokens_in,
-            "tokens_out": tokens_out,
-            "created_at": now,
+        params = {
+            "p_session_id": session_id,
+            "p_role": role,
+            "p_content": content,
+            "p_tokens_in": tokens_in,
+            "p_tokens_out": tokens_out,
         }
         try:
-            self._client.table(self._messages_table).insert(record).execute()
-            self._client.table(self._sessions_table).update(
-                {"updated_at": now}
-            ).eq("id", session_id).execute()
-            invalidate_messages_cache(session_id)
-            invalidate_session_cache()
+            # Insert + session touch run server-side in a single round-trip
+            resp = self._client.rpc(ADD_MESSAGE_FUNCTION, params).execute()
+            _fetch_session_messages.clear(self._messages_table, session_id)
+            _fetch_user_sessions.clear(self._sessions_table, user_id)
             success = True
-            return mid
+            return getattr(resp, "data", None)
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Failed to add message to session {session_id}: {e}")
@@ -314,36 +395,16 @@ class ChatDatabase:
     def get_total_message_count(self, user_id: str) -> int:
         """
         Get total message count across all sessions for a user (optimized).
-        Uses a single query instead of N queries.
+        Uses a single RPC that returns the count instead of fetching session ids first.
         """
         start = time.perf_counter()
         success = False
         error_msg = None
         count = 0
         try:
-            # Get all session IDs for this user
-            sessions_resp = (
-                self._client.table(self._sessions_table)
-                .select("id")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            session_ids = [s["id"] for s in (getattr(sessions_resp, "data", []) or [])]
-
-            if not session_ids:
-                duration_ms = (time.perf_counter() - start) * 1000
-                return 0
-
-            # Count all messages for these sessions in one query
-            messages_resp = (
-                self._client.table(self._messages_table)
-                .select("id", count="exact")
-                .in_("session_id", session_ids)
-                .execute()
-            )
-
-            # Get count from response
-            count = getattr(messages_resp, "count", 0) or 0
+            # Count is computed server-side with a join (see docs/chat_functions.sql)
+            resp = self._client.rpc(MESSAGE_COUNT_FUNCTION, {"p_user_id": user_id}).execute()
+            count = int(getattr(resp, "data", 0) or 0)
             success = True
             return count
         except Exception as e:
@@ -363,11 +424,9 @@ class ChatDatabase:
 
     # search/export
     def search_sessions(self, user_id: str, query: str) -> list[dict]:
-        start = time.perf_counter()
-        error_msg = None
-        success = False
-        sessions = self.get_user_sessions(user_id)
         if not query:
+            start = time.perf_counter()
+            sessions = self.get_user_sessions(user_id)
             duration_ms = (time.perf_counter() - start) * 1000
             self._log_db_event(
                 "search_sessions",
@@ -378,102 +437,60 @@ class ChatDatabase:
             )
             return sessions
 
-        q = escape_sql_like((query or "").lower())
-        matching_sessions = {}
-
-        # First pass: Find sessions that match by name
-        for s in sessions:
-            name = s.get("session_name", "")
-            if q in name.lower():
-                matching_sessions[s.get("id")] = s
-
-        # Second pass: Find sessions that match by message content
+        start = time.perf_counter()
+        error_msg = None
+        success = False
+        results: list[dict] = []
         try:
-            session_ids = [s.get("id") for s in sessions if s.get("id") not in matching_sessions]
-            if session_ids:
-                resp = (
-                    self._client.table(self._messages_table)
-                    .select("session_id")
-                    .in_("session_id", session_ids)
-                    .ilike("content", f"%{q}%")
-                    .execute()
-                )
-                matched_session_ids = {msg.get("session_id") for msg in (getattr(resp, "data", []) or [])}
-                for s in sessions:
-                    if s.get("id") in matched_session_ids:
-                        matching_sessions[s.get("id")] = s
-
+            # Name + message content matching happens in one indexed query (see docs/chat_functions.sql)
+            resp = self._client.rpc(
+                SEARCH_SESSIONS_FUNCTION,
+                {"p_user_id": user_id, "p_q": escape_sql_like(query.lower())},
+            ).execute()
+            results = getattr(resp, "data", []) or []
             success = True
-            return list(matching_sessions.values())
+            return results
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"Failed to search messages: {e}")
+            logger.error(f"Failed to search sessions for {user_id}: {e}")
+            return []
         finally:
             duration_ms = (time.perf_counter() - start) * 1000
             self._log_db_event(
                 "search_sessions",
                 duration_ms,
                 success,
-                result_count=len(matching_sessions),
+                result_count=len(results),
                 error=error_msg,
-                table=self._messages_table,
+                table=self._sessions_table,
             )
 
-        return list(matching_sessions.values())
-
-    def export_session_json(self, user_id: str, session_id: str) -> str:
+    def export_session_json(self, user_id: str, session_id: str) -> bytes:
         session = self.get_session(session_id)
         if not session or session.get("user_id") != user_id:
-            return json.dumps({"error": "session not found"})
+            return orjson.dumps({"error": "session not found"})
         messages = self.get_session_messages(session_id)
         export_data = {
             "session_name": session.get("session_name"),
             "created_at": session.get("created_at"),
             "messages": messages,
         }
-        return json.dumps(export_data, indent=2)
-
-    def _start_audit_worker(self):
-        if not self._audit_table:
-            return
-        self._audit_worker_thread = threading.Thread(target=self._audit_worker_loop, daemon=True)
-        self._audit_worker_thread.start()
-
-    def _audit_worker_loop(self):
-        while not self._audit_shutdown_event.is_set():
-            time.sleep(2)
-            with self._audit_lock:
-                if len(self._audit_batch) >= self._audit_batch_size:
-                    self._flush_audit_batch()
-
-    def _flush_audit_batch(self):
-        if not self._audit_batch:
-            return
-        batch = self._audit_batch.copy()
-        self._audit_batch.clear()
-        try:
-            self._client.table(self._audit_table).insert(batch).execute()
-        except Exception as e:
-            logger.error(f"Failed to flush audit batch: {e}")
+        return orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC)
 
     def log_event(self, session_id: str, event_type: str, payload: dict[str, Any]) -> None:
         if not self._audit_table:
             return
         record = {
-            "id": str(uuid.uuid4()),
             "session_id": session_id,
             "event_type": event_type,
             "payload": payload,
-            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
         }
-        with self._audit_lock:
-            self._audit_batch.append(record)
-            if len(self._audit_batch) >= self._audit_batch_size:
-                self._flush_audit_batch()
+        try:
+            _audit_queue.put_nowait((self._audit_table, record))
+        except queue.Full:
+            logger.warning(f"Audit queue full, dropping {event_type} event")
 
     def close(self):
-        self._audit_shutdown_event.set()
-        if self._audit_worker_thread and self._audit_worker_thread.is_alive():
-            self._audit_worker_thread.join(timeout=2)
-        with self._audit_lock:
-            self._flush_audit_batch()
+        """Flush any queued audit records now instead of waiting for the worker."""
+        while not _audit_queue.empty():
+            _flush_audit_batch(_drain_audit_queue())
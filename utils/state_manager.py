@@ -1,95 +1,109 @@
+import re
 import streamlit as st
 from datetime import date, datetime
 from typing import Any
-import time
 
 
 RECENT_ACTION_LIMIT = 5
-SESSION_CACHE_TTL = 2.0
 
-
-def initialize_session_state() -> None:
+_EMAIL_CUES = (
+    "email assistant",
+    "draft an email",
+    "compose an email",
+    "send an email",
+)
+_MEETING_CUES = (
+    "meeting assistant",
+    "schedule a meeting",
+    "calendar invite",
+    "book a meeting",
+)
+# One alternation per assistant so each response is scanned once, not once per cue
+_EMAIL_CUE_RE = re.compile("|".join(map(re.escape, _EMAIL_CUES)))
+_MEETING_CUE_RE = re.compile("|".join(map(re.escape, _MEETING_CUES)))
+
+
+def _default_meeting_time():
+    return datetime.now().replace(second=0, microsecond=0).time()
+
+
+# Callables are factories so mutable/time-based defaults are built fresh, and only when missing.
+_DEFAULTS: dict[str, Any] = {
     # Authentication
-    if "authenticated" not in st.session_state:
-        st.session_state.authenticated = False
-    if "user_id" not in st.session_state:
-        st.session_state.user_id = None
-    if "username" not in st.session_state:
-        st.session_state.username = None
+    "authenticated": False,
+    "user_id": None,
+    "username": None,
 
     # Chat session
-    if "current_session_id" not in st.session_state:
-        st.session_state.current_session_id = None
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    if "pending_regen" not in st.session_state:
-        st.session_state.pending_regen = False
+    "current_session_id": None,
+    "messages": list,
+    "pending_regen": False,
 
     # Token budget tracking
-    if "token_total" not in st.session_state:
-        st.session_state.token_total = 0
-    if "limit_reached" not in st.session_state:
-        st.session_state.limit_reached = False
-    st.session_state.setdefault("current_request_id", None)
-    st.session_state.setdefault("request_start_time", None)
+    "token_total": 0,
+    "limit_reached": False,
+    "current_request_id": None,
+    "request_start_time": None,
 
     # Assistant UI state
-    st.session_state.setdefault("show_tool_picker", False)
-    st.session_state.setdefault("show_email_builder", False)
-    st.session_state.setdefault("show_meeting_builder", False)
+    "show_tool_picker": False,
+    "show_email_builder": False,
+    "show_meeting_builder": False,
 
     # Email assistant state
-    st.session_state.setdefault("pending_email", None)
-    st.session_state.setdefault("pending_email_draft", None)  
-    st.session_state.setdefault("pending_email_edit", None) 
-    st.session_state.setdefault("email_to_input", "")
-    st.session_state.setdefault("email_subject_input", "")
-    st.session_state.setdefault("email_student_message", "")
-    st.session_state.setdefault("email_draft_text", "")
-    st.session_state.setdefault("email_draft_sync_value", None)
-    st.session_state.setdefault("email_subject_sync_value", None)
-    st.session_state.setdefault("email_edit_instructions", "")
-    st.session_state.setdefault("email_fields_reset_pending", False)
+    "pending_email": None,
+    "pending_email_draft": None,
+    "pending_email_edit": None,
+    "email_to_input": "",
+    "email_subject_input": "",
+    "email_student_message": "",
+    "email_draft_text": "",
+    "email_draft_sync_value": None,
+    "email_subject_sync_value": None,
+    "email_edit_instructions": "",
+    "email_fields_reset_pending": False,
 
     # Meeting assistant state
-    st.session_state.setdefault("pending_meeting", None)
-    st.session_state.setdefault("pending_meeting_plan", None)  
-    st.session_state.setdefault("pending_meeting_edit", None)  
-    st.session_state.setdefault("meeting_summary_input", "")
-    st.session_state.setdefault("meeting_duration_input", 30)
-    st.session_state.setdefault("meeting_attendees_input", "")
-    st.session_state.setdefault("meeting_description_input", "")
-    st.session_state.setdefault("meeting_location_input", "")
-    st.session_state.setdefault("meeting_timezone_input", "US/Eastern (EST)")
-    st.session_state.setdefault("meeting_date_input", date.today())
-    st.session_state.setdefault(
-        "meeting_time_input",
-        datetime.now().replace(second=0, microsecond=0).time(),
-    )
-    st.session_state.setdefault("meeting_fields_reset_pending", False)
-    st.session_state.setdefault("meeting_notes_text", "")
-    st.session_state.setdefault("meeting_notes_sync_value", None)
-    st.session_state.setdefault("meeting_edit_instructions", "")
+    "pending_meeting": None,
+    "pending_meeting_plan": None,
+    "pending_meeting_edit": None,
+    "meeting_summary_input": "",
+    "meeting_duration_input": 30,
+    "meeting_attendees_input": "",
+    "meeting_description_input": "",
+    "meeting_location_input": "",
+    "meeting_timezone_input": "US/Eastern (EST)",
+    "meeting_date_input": date.today,
+    "meeting_time_input": _default_meeting_time,
+    "meeting_fields_reset_pending": False,
+    "meeting_notes_text": "",
+    "meeting_notes_sync_value": None,
+    "meeting_edit_instructions": "",
 
     # Action tracking
-    st.session_state.setdefault("recent_actions", [])
-    st.session_state.setdefault("pending_action_collapses", [])
+    "recent_actions": list,
+    "pending_action_collapses": list,
 
     # Processing state (for blocking all interactions during bot response)
-    st.session_state.setdefault("is_processing", False)
-    st.session_state.setdefault("pending_user_input", None)
+    "is_processing": False,
+    "pending_user_input": None,
 
     # Dashboard
-    st.session_state.setdefault("show_dashboard", True)
-    st.session_state.setdefault("show_observability", False)
+    "show_dashboard": True,
+    "show_observability": False,
 
     # Login flow
-    st.session_state.setdefault("pending_login", None)
+    "pending_login": None,
+}
 
-    st.session_state.setdefault("_session_cache", {})
-    st.session_state.setdefault("_session_cache_time", 0)
-    st.session_state.setdefault("_messages_cache", {})
-    st.session_state.setdefault("_messages_cache_time", {})
+
+def initialize_session_state() -> None:
+    # Runs on every rerun: Streamlit drops widget-bound keys (email_*/meeting_* inputs)
+    # whenever their widget isn't rendered, so a one-shot init flag would lose them.
+    state = st.session_state
+    for key, default in _DEFAULTS.items():
+        if key not in state:
+            state[key] = default() if callable(default) else default
 
 
 def activate_assistant(kind: str | None, *, rerun: bool = False) -> None:
@@ -136,58 +150,7 @@ def maybe_auto_open_assistant(response_text: str | None) -> None:
     if not response_text:
         return
     lowered = response_text.lower()
-    email_cues = (
-        "email assistant",
-        "draft an email",
-        "compose an email",
-        "send an email",
-    )
-    meeting_cues = (
-        "meeting assistant",
-        "schedule a meeting",
-        "calendar invite",
-        "book a meeting",
-    )
-    if any(cue in lowered for cue in email_cues):
+    if _EMAIL_CUE_RE.search(lowered):
         activate_assistant("email")
-    elif any(cue in lowered for cue in meeting_cues):
+    elif _MEETING_CUE_RE.search(lowered):
         activate_assistant("meeting")
-
-
-def get_cached_sessions(user_id: str) -> list[dict] | None:
-    if st.session_state._session_cache.get("user_id") != user_id:
-        return None
-    if time.time() - st.session_state._session_cache_time > SESSION_CACHE_TTL:
-        return None
-    return st.session_state._session_cache.get("sessions")
-
-
-def set_cached_sessions(user_id: str, sessions: list[dict]) -> None:
-    st.session_state._session_cache = {"user_id": user_id, "sessions": sessions}
-    st.session_state._session_cache_time = time.time()
-
-
-def invalidate_session_cache() -> None:
-    st.session_state._session_cache = {}
-    st.session_state._session_cache_time = 0
-
-
-def get_cached_messages(session_id: str) -> list[dict] | None:
-    if session_id not in st.session_state._messages_cache:
-        return None
-    cache_time = st.session_state._messages_cache_time.get(session_id, 0)
-    if time.time() - cache_time > SESSION_CACHE_TTL:
-        return None
-    return st.session_state._messages_cache[session_id]
-
-
-def set_cached_messages(session_id: str, messages: list[dict]) -> None:
-    st.session_state._messages_cache[session_id] = messages
-    st.session_state._messages_cache_time[session_id] = time.time()
-
-
-def invalidate_messages_cache(session_id: str) -> None:
-    if session_id in st.session_state._messages_cache:
-        del st.session_state._messages_cache[session_id]
-    if session_id in st.session_state._messages_cache_time:
-        del st.session_state._messages_cache_time[session_id]
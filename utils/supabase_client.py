@@ -21,4 +21,6 @@ def get_supabase_client() -> Client:
             "SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_API_KEY) are set."
         )
 
+    # postgrest's default session is already a pooled httpx client with http2=True, and
+    # supabase rebuilds it on auth events, so it is used as-is rather than swapped out.
     return create_client(url, key)
\ No newline at end of file